@@ -1,5 +1,6 @@
 import sqlite3
 import os
+import time
 import logging
 from dotenv import load_dotenv
 from contextlib import contextmanager
@@ -184,6 +185,56 @@ def mark_all_ordered() -> int:
         logger.info(f"Marked {count} items as ordered.")
         return count
 
+def save_user_name(user_id: str, user_name: str, ts: float) -> None:
+    """Stores (or refreshes) a cached Slack display name."""
+    with get_db_connection() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO user_names (user_id, user_name, updated_at) VALUES (?, ?, ?)",
+            (user_id, user_name, ts)
+        )
+        conn.commit()
+    logger.debug(f"Persisted user name for {user_id}: '{user_name}'")
+
+def load_recent_user_names(since_days: int = 7) -> Dict[str, str]:
+    """
+    Returns Slack display names cached within the last `since_days`, keyed by user ID.
+    Older rows are deleted so renamed users are looked up again after a restart.
+    """
+    cutoff = time.time() - since_days * 86400
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM user_names WHERE updated_at < ?", (cutoff,))
+        conn.commit()
+        cursor.execute("SELECT user_id, user_name FROM user_names")
+        names = {row["user_id"]: row["user_name"] for row in cursor.fetchall()}
+    logger.debug(f"Loaded {len(names)} user names cached in the last {since_days} days.")
+    return names
+
+def track_bot_thread(thread_ts: str, ts: Optional[float] = None) -> None:
+    """Records a thread as bot-initiated (refreshing its timestamp if already known)."""
+    with get_db_connection() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO bot_threads (thread_ts, tracked_at) VALUES (?, ?)",
+            (thread_ts, ts if ts is not None else time.time())
+        )
+        conn.commit()
+    logger.debug(f"Persisted bot thread {thread_ts}")
+
+def load_recent_bot_threads(since_days: int = 30) -> List[str]:
+    """
+    Returns bot-initiated thread timestamps tracked within the last `since_days`, oldest first.
+    Older rows are deleted so the table doesn't grow without bound.
+    """
+    cutoff = time.time() - since_days * 86400
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM bot_threads WHERE tracked_at < ?", (cutoff,))
+        conn.commit()
+        cursor.execute("SELECT thread_ts FROM bot_threads ORDER BY tracked_at ASC")
+        threads = [row["thread_ts"] for row in cursor.fetchall()]
+    logger.debug(f"Loaded {len(threads)} bot threads tracked in the last {since_days} days.")
+    return threads
+
 # Auto-initialize DB on first import if DB file doesn't exist
 # Note: `main.py` also calls initialize_db on startup, which is more robust for server restarts
 # if not os.path.exists(DATABASE_PATH):
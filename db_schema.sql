@@ -12,4 +12,18 @@ CREATE TABLE IF NOT EXISTS shopping_items (
 );
 
 CREATE INDEX IF NOT EXISTS idx_user_id_status ON shopping_items (user_id, status);
-CREATE INDEX IF NOT EXISTS idx_status ON shopping_items (status);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_status ON shopping_items (status);
+
+-- Warm-state caches for the Slack handler, reloaded on startup
+CREATE TABLE IF NOT EXISTS user_names (
+    user_id TEXT PRIMARY KEY,
+    user_name TEXT NOT NULL,
+    updated_at REAL NOT NULL -- Unix timestamp
+);
+
+CREATE TABLE IF NOT EXISTS bot_threads (
+    thread_ts TEXT PRIMARY KEY,
+    tracked_at REAL NOT NULL -- Unix timestamp
+);
+
+CREATE INDEX IF NOT EXISTS idx_bot_threads_tracked_at ON bot_threads (tracked_at);
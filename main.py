@@ -81,9 +81,10 @@ async def startup_event():
     db_path = os.getenv("DATABASE_PATH", "shopping_list.db") # Default for local
     if not os.path.exists(db_path):
         logger.info(f"Database not found at {db_path}, initializing.")
-        initialize_db()
     else:
         logger.info(f"Database file found at {db_path}.")
+    # Schema uses IF NOT EXISTS, so this also adds tables introduced since the DB was created
+    initialize_db()
         
     # Proactively fetch Agent User ID on startup
     await get_agent_user_id(slack_client)
@@ -101,6 +102,7 @@ async def shutdown_event():
     if scheduler.running:
         scheduler.shutdown()
     logger.info("Scheduler shut down.")
+    await slack_handler.close_http_session()
 
 # --- Run the app ---
 if __name__ == "__main__":
@@ -1,7 +1,9 @@
 import asyncio
 import logging
 import os
+import re
 import json # Import json
+from difflib import SequenceMatcher
 from typing import Dict, Optional, List, Any # Use Any for broader dict compatibility
 import aiohttp # For URL validation
 
@@ -9,6 +11,7 @@ import aiohttp # For URL validation
 from playwright.async_api import async_playwright, Error as PlaywrightError
 from bs4 import BeautifulSoup
 import openai
+from openai import AsyncOpenAI
 
 logger = logging.getLogger(__name__)
 
@@ -22,21 +25,43 @@ if not os.getenv("OPENAI_API_KEY"):
 # client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 # --- URL Validation ---
-async def validate_target_url(url: str, skip_http_check: bool = False) -> bool:
+TARGET_PRODUCT_URL_PATTERN = re.compile(r'^https://www\.target\.com/p/[^/]+/(?:-/[A-Z0-9-]+)?$')
+
+URL_VALIDATION_TIMEOUT = aiohttp.ClientTimeout(total=5)  # 5 second timeout
+
+async def _check_url_response(session: aiohttp.ClientSession, url: str) -> bool:
+    """Requests the URL through `session` and maps the response to a validity result."""
+    try:
+        # Use GET instead of HEAD as Target might block HEAD requests
+        async with session.get(url, allow_redirects=True, timeout=URL_VALIDATION_TIMEOUT) as response:
+            if response.status == 200:
+                logger.info(f"URL validated successfully: {url}")
+                return True
+            elif response.status == 403:
+                # Target might return 403 for bot protection, but URL could still be valid
+                logger.warning(f"URL returned 403 Forbidden (may still be valid): {url}")
+                return True  # Consider 403 as valid to be less strict
+            else:
+                logger.warning(f"URL validation failed with status {response.status}: {url}")
+                return False
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        # Connection errors might be temporary, so we'll consider the URL potentially valid
+        logger.warning(f"Connection error during URL validation (considering valid): {url} - {str(e)}")
+        return True  # Be lenient on connection errors
+
+async def validate_target_url(url: str, skip_http_check: bool = False,
+                              session: Optional[aiohttp.ClientSession] = None) -> bool:
     """
     Validate that a URL is a valid Target product URL.
     Now with option to skip HTTP check and only check format.
+    Pass `session` to reuse pooled connections across many validations.
     """
-    import re
-    import aiohttp
-    
     # Basic format validation
     if not url or not isinstance(url, str):
         return False
     
     # Check if it's a Target product URL with the expected format
-    target_product_pattern = r'^https://www\.target\.com/p/[^/]+/(?:-/[A-Z0-9-]+)?$'
-    if not re.match(target_product_pattern, url):
+    if not TARGET_PRODUCT_URL_PATTERN.match(url):
         logger.debug(f"URL failed format validation: {url}")
         return False
     
@@ -47,25 +72,10 @@ async def validate_target_url(url: str, skip_http_check: bool = False) -> bool:
     
     # Otherwise, make an HTTP request to validate
     try:
-        timeout = aiohttp.ClientTimeout(total=5)  # 5 second timeout
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            try:
-                # Use GET instead of HEAD as Target might block HEAD requests
-                async with session.get(url, allow_redirects=True) as response:
-                    if response.status == 200:
-                        logger.info(f"URL validated successfully: {url}")
-                        return True
-                    elif response.status == 403:
-                        # Target might return 403 for bot protection, but URL could still be valid
-                        logger.warning(f"URL returned 403 Forbidden (may still be valid): {url}")
-                        return True  # Consider 403 as valid to be less strict
-                    else:
-                        logger.warning(f"URL validation failed with status {response.status}: {url}")
-                        return False
-            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-                # Connection errors might be temporary, so we'll consider the URL potentially valid
-                logger.warning(f"Connection error during URL validation (considering valid): {url} - {str(e)}")
-                return True  # Be lenient on connection errors
+        if session is not None:
+            return await _check_url_response(session, url)
+        async with aiohttp.ClientSession(timeout=URL_VALIDATION_TIMEOUT) as own_session:
+            return await _check_url_response(own_session, url)
     except Exception as e:
         logger.error(f"Error validating URL: {url} - {str(e)}")
         # On unexpected errors, be lenient and consider valid
@@ -207,11 +217,6 @@ async def search_products_gpt(query: str, max_results: int = 3) -> List[Dict[str
     Search for products using GPT-4o with web search capabilities
     Returns a list of products with their details
     """
-    from openai import AsyncOpenAI
-    import os
-    import re
-    from difflib import SequenceMatcher
-
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         logger.error("OPENAI_API_KEY not found in environment")
@@ -237,6 +237,8 @@ def load_custom_reminders(scheduler, client):
         with open("custom_reminders.json", "r") as f:
             saved_reminders = json.load(f)
         
+        fromiso = datetime.fromisoformat
+        now = datetime.now()
         for job_id, reminder in saved_reminders.items():
             try:
                 if reminder["type"] == "weekly":
@@ -251,9 +253,9 @@ def load_custom_reminders(scheduler, client):
                         replace_existing=True
                     )
                 elif reminder["type"] == "once":
-                    run_date = datetime.fromisoformat(reminder["run_date"])
+                    run_date = fromiso(reminder["run_date"])
                     # Only schedule if it's in the future
-                    if run_date > datetime.now():
+                    if run_date > now:
                         scheduler.add_job(
                             send_custom_reminder,
                             trigger='date',
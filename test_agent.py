@@ -22,6 +22,9 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Inputs that end the console session
+_EXIT_WORDS = frozenset(("exit", "quit", "bye"))
+
 async def main():
     # Check if OpenAI API key is set
     if not os.getenv("OPENAI_API_KEY"):
@@ -53,7 +56,7 @@ async def main():
         user_input = input("You: ")
         
         # Check if user wants to exit
-        if user_input.lower() in ['exit', 'quit', 'bye']:
+        if user_input.lower() in _EXIT_WORDS:
             print("Exiting test console.")
             break
         
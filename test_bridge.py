@@ -7,6 +7,10 @@ This script creates sample data and tests the bridge functionality.
 import os
 import json
 import logging
+try:
+    import orjson
+except ImportError:
+    orjson = None
 from target_bridge import TargetBridge
 
 logging.basicConfig(level=logging.INFO, 
@@ -57,19 +61,23 @@ SAMPLE_ITEMS = [
     }
 ]
 
+# SAMPLE_ITEMS never changes, so serialize it once at import time
+if orjson is not None:
+    _SAMPLE_JSON_BYTES = orjson.dumps(SAMPLE_ITEMS, option=orjson.OPT_INDENT_2)
+else:
+    _SAMPLE_JSON_BYTES = json.dumps(SAMPLE_ITEMS, indent=2).encode("utf-8")
+
 def create_sample_data():
     """Create sample data files for testing."""
     # Create exports directory if it doesn't exist
     export_dir = os.getenv("EXPORT_DIR", "./exports")
-    if not os.path.exists(export_dir):
-        os.makedirs(export_dir, exist_ok=True)
-        logger.info(f"Created export directory: {export_dir}")
+    os.makedirs(export_dir, exist_ok=True)
     
     # Create sample JSON file
     sample_json_path = os.path.join(export_dir, "sample_shopping_list.json")
     try:
-        with open(sample_json_path, 'w') as f:
-            json.dump(SAMPLE_ITEMS, f, indent=2)
+        with open(sample_json_path, 'wb') as f:
+            f.write(_SAMPLE_JSON_BYTES)
         logger.info(f"Created sample JSON file: {sample_json_path}")
         return sample_json_path
     except Exception as e:
@@ -5,8 +5,13 @@ import os
 import json
 import logging
 import sys
+import aiohttp
+try:
+    import orjson
+except ImportError:
+    orjson = None
 from dotenv import load_dotenv
-from product_service import search_products_gpt, validate_target_url
+from product_service import search_products_gpt, validate_target_url, TARGET_PRODUCT_URL_PATTERN
 
 # Configure logging
 logging.basicConfig(
@@ -34,7 +39,17 @@ if not api_key:
 else:
     logger.info("OPENAI_API_KEY found in environment")
 
-async def test_search(query):
+# URL validation tasks for this run, so each URL hits the network once even when
+# concurrent queries ask for it at the same time
+_validated_urls = {}
+
+async def validate_url_cached(url, session=None):
+    """Validates a Target URL, reusing the (possibly still pending) check from this run"""
+    if url not in _validated_urls:
+        _validated_urls[url] = asyncio.ensure_future(validate_target_url(url, session=session))
+    return await _validated_urls[url]
+
+async def test_search(query, session=None):
     """Test the product search functionality"""
     logger.info(f"Testing product search for: '{query}'")
     
@@ -48,7 +63,12 @@ async def test_search(query):
             
         logger.info(f"Search returned {len(results)} results")
         
-        # Print results in a readable format
+        # Validate all distinct URLs concurrently before printing
+        urls = list(dict.fromkeys(product.get('url') for product in results if product.get('url')))
+        await asyncio.gather(*(validate_url_cached(url, session) for url in urls))
+        
+        # Print results in a readable format, collecting verified URLs as we go
+        valid_urls = []
         for i, product in enumerate(results, 1):
             logger.info(f"Product {i}:")
             logger.info(f"  Name: {product.get('product_title')}")
@@ -59,29 +79,27 @@ async def test_search(query):
             if url:
                 logger.info(f"  URL: {url}")
                 # Validate URL
-                is_valid = await validate_target_url(url)
+                is_valid = await validate_url_cached(url)
                 validation_status = "✅ VALID" if is_valid else "❌ INVALID"
                 logger.info(f"  URL Validation: {validation_status}")
+                if is_valid and TARGET_PRODUCT_URL_PATTERN.match(url):
+                    valid_urls.append(url)
             else:
                 logger.info(f"  URL: None")
                 
             logger.info(f"  In Stock: {product.get('in_stock')}")
             
-        # Validate URLs
-        valid_urls = []
-        for product in results:
-            url = product.get('url')
-            if url and url.startswith('https://www.target.com/p/'):
-                is_valid = await validate_target_url(url)
-                if is_valid:
-                    valid_urls.append(url)
-                    
         logger.info(f"Found {len(valid_urls)} verified working Target product URLs out of {len(results)} results")
         
         # Save results to a file for inspection
-        with open(f"search_results_{query.replace(' ', '_')}.json", "w") as f:
-            json.dump(results, f, indent=2)
-            logger.info(f"Saved results to search_results_{query.replace(' ', '_')}.json")
+        results_path = f"search_results_{query.replace(' ', '_')}.json"
+        if orjson is not None:
+            data = orjson.dumps(results, option=orjson.OPT_INDENT_2)
+        else:
+            data = json.dumps(results, indent=2).encode("utf-8")
+        with open(results_path, "wb") as f:
+            f.write(data)
+        logger.info(f"Saved results to {results_path}")
             
         return len(valid_urls) > 0
         
@@ -97,11 +115,17 @@ async def main():
         "Nintendo Switch game"
     ]
     
-    results = []
-    for query in test_queries:
-        success = await test_search(query)
-        results.append((query, success))
-        logger.info("-" * 50)
+    # One pooled session for every URL validation in this run
+    connector = aiohttp.TCPConnector(limit=50, ttl_dns_cache=300)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def run_query(query):
+            success = await test_search(query, session)
+            logger.info("-" * 50)
+            return success
+        
+        # Queries are independent, so run them concurrently
+        outcomes = await asyncio.gather(*(run_query(query) for query in test_queries))
+    results = list(zip(test_queries, outcomes))
     
     # Print summary
     logger.info("\nTest Results Summary:")
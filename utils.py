@@ -2,7 +2,13 @@ import re
 import logging
 import os
 import json
-from datetime import datetime
+try:
+    import orjson # Faster JSON encoding for exports
+except ImportError:
+    orjson = None
+import time
+from functools import lru_cache
+from collections import defaultdict
 from typing import Optional, List, Dict, Any # Import Optional
 
 logger = logging.getLogger(__name__)
@@ -10,36 +16,85 @@ logger = logging.getLogger(__name__)
 # Basic URL detection focusing on Target product pages
 # Improved to be slightly more robust, but still basic
 TARGET_URL_PATTERN = re.compile(r'https?://(?:www\.)?target\.com/p/([-/\w]+)/-/A-\w+')
+# Literal every TARGET_URL_PATTERN match contains; checked before running the regex
+_TARGET_URL_MARKER = "target.com/p/"
 
-def extract_target_url(text: str) -> Optional[str]:
-    """Extracts the first matching Target product URL from text."""
+# Texts longer than this are matched directly instead of being held in the cache
+_URL_CACHE_MAX_TEXT_LEN = 2048
+
+# Set this to False to always scan messages with TARGET_URL_PATTERN.search
+USE_FAST_URL_EXTRACTION = True
+
+def extract_target_url_fast(text: str) -> Optional[str]:
+    """
+    Locates the first Target URL with str.find and checks it with an anchored match,
+    falling back to a full regex search when the shortcut does not apply.
+    """
     if not isinstance(text, str):
         return None
+    marker = text.find(_TARGET_URL_MARKER)
+    if marker < 0:
+        return None
+    # The URL can only start at the last "http" before the first marker
+    start = text.rfind("http", 0, marker)
+    if start >= 0:
+        match = TARGET_URL_PATTERN.match(text, start)
+        if match:
+            return match.group(0)
+    match = TARGET_URL_PATTERN.search(text)
+    return match.group(0) if match else None
+
+def _extract_target_url_regex(text: str) -> Optional[str]:
     match = TARGET_URL_PATTERN.search(text)
-    if match:
-         url = match.group(0)
+    return match.group(0) if match else None
+
+# One cache per extraction path, so toggling USE_FAST_URL_EXTRACTION takes effect immediately
+_extract_target_url_fast_cached = lru_cache(maxsize=4096)(extract_target_url_fast)
+_extract_target_url_regex_cached = lru_cache(maxsize=4096)(_extract_target_url_regex)
+
+def extract_target_url(text: str) -> Optional[str]:
+    """Extracts the first matching Target product URL from text."""
+    if not isinstance(text, str) or _TARGET_URL_MARKER not in text:
+        return None
+    extract = _extract_target_url_fast_cached if USE_FAST_URL_EXTRACTION else _extract_target_url_regex_cached
+    url = extract.__wrapped__(text) if len(text) > _URL_CACHE_MAX_TEXT_LEN else extract(text)
+    if url:
          logger.debug(f"Extracted Target URL: {url}")
-         return url
-    return None
+    return url
 
 def format_price(price: Optional[float]) -> str:
     """Formats a float price into a string like $X.XX, or indicates if not found."""
     if price is None:
         return "Price not found"
+    if type(price) is float:
+        return f"${price:.2f}"
     try:
-        # Ensure price is float before formatting
-        price_float = float(price)
-        return f"${price_float:.2f}"
+        # Coerce ints, Decimals and numeric strings before formatting
+        return f"${float(price):.2f}"
     except (ValueError, TypeError):
         logger.warning(f"Could not format invalid price value: {price}")
         return "Invalid price data"
 
 # Add more helper functions as needed, e.g., for cleaning text
+_WHITESPACE_RUN = re.compile(r"\s+")
+
 def clean_text(text: str) -> str:
      """Basic text cleaning (e.g., removing extra whitespace)."""
      if not isinstance(text, str):
           return ""
-     return " ".join(text.split())
+     return _WHITESPACE_RUN.sub(" ", text).strip()
+
+# Resolved (and created) on first export
+_EXPORT_DIR: Optional[str] = None
+
+def _get_export_dir() -> str:
+    """Returns the export directory, creating it on first use."""
+    global _EXPORT_DIR
+    if _EXPORT_DIR is None:
+        export_dir = os.getenv("EXPORT_DIR", "./exports")
+        os.makedirs(export_dir, exist_ok=True)
+        _EXPORT_DIR = export_dir
+    return _EXPORT_DIR
 
 def export_shopping_list(items: List[Dict[str, Any]], export_format: str = "json") -> Optional[str]:
     """
@@ -56,35 +111,36 @@ def export_shopping_list(items: List[Dict[str, Any]], export_format: str = "json
         logger.warning("No items to export")
         return None
     
-    # Create exports directory if it doesn't exist
-    export_dir = os.getenv("EXPORT_DIR", "./exports")
-    if not os.path.exists(export_dir):
-        os.makedirs(export_dir, exist_ok=True)
-        logger.info(f"Created export directory: {export_dir}")
+    export_dir = _get_export_dir()
     
     # Generate a timestamp for the filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
     
     if export_format.lower() == "json":
         # Create a simplified version of the items for export
-        export_items = []
-        for item in items:
-            export_items.append({
+        export_items = [
+            {
                 "id": item.get("id"),
                 "product_title": item.get("product_title"),
                 "product_url": item.get("product_url"),
                 "price": item.get("price"),
                 "quantity": item.get("quantity", 1),
                 "user_name": item.get("user_name", "Unknown User")
-            })
+            }
+            for item in items
+        ]
         
         # Generate the filename
         filename = f"shopping_list_{timestamp}.json"
         file_path = os.path.join(export_dir, filename)
         
         try:
-            with open(file_path, 'w') as f:
-                json.dump(export_items, f, indent=2)
+            if orjson is not None:
+                data = orjson.dumps(export_items, option=orjson.OPT_INDENT_2)
+            else:
+                data = json.dumps(export_items, indent=2).encode("utf-8")
+            with open(file_path, 'wb') as f:
+                f.write(data)
             logger.info(f"Successfully exported shopping list to JSON: {file_path}")
             return file_path
         except Exception as e:
@@ -97,35 +153,32 @@ def export_shopping_list(items: List[Dict[str, Any]], export_format: str = "json
         file_path = os.path.join(export_dir, filename)
         
         try:
+            # Group items by user
+            items_by_user = defaultdict(list)
+            for item in items:
+                items_by_user[item.get("user_name", "Unknown User")].append(item)
+            
+            # Build the whole file in memory and write it once
+            parts = ["Shopping List\n", "============\n\n"]
+            for user_name, user_items in items_by_user.items():
+                parts.append(f"User: {user_name}\n")
+                for item in user_items:
+                    product_title = item.get("product_title", "Unknown Item")
+                    quantity = item.get("quantity", 1)
+                    price = item.get("price")
+                    price_str = format_price(price) if price is not None else "Price not found"
+                    
+                    line = f"- {quantity} x {product_title} ({price_str})"
+                    
+                    product_url = item.get("product_url")
+                    if product_url:
+                        line += f"\n  URL: {product_url}"
+                    
+                    parts.append(line + "\n")
+                parts.append("\n")
+            
             with open(file_path, 'w') as f:
-                f.write("Shopping List\n")
-                f.write("============\n\n")
-                
-                # Group items by user
-                items_by_user = {}
-                for item in items:
-                    user_name = item.get("user_name", "Unknown User")
-                    if user_name not in items_by_user:
-                        items_by_user[user_name] = []
-                    items_by_user[user_name].append(item)
-                
-                # Write items grouped by user
-                for user_name, user_items in items_by_user.items():
-                    f.write(f"User: {user_name}\n")
-                    for item in user_items:
-                        product_title = item.get("product_title", "Unknown Item")
-                        quantity = item.get("quantity", 1)
-                        price = item.get("price")
-                        price_str = format_price(price) if price is not None else "Price not found"
-                        
-                        line = f"- {quantity} x {product_title} ({price_str})"
-                        
-                        product_url = item.get("product_url")
-                        if product_url:
-                            line += f"\n  URL: {product_url}"
-                        
-                        f.write(line + "\n")
-                    f.write("\n")
+                f.write("".join(parts))
             
             logger.info(f"Successfully exported shopping list to TXT: {file_path}")
             return file_path